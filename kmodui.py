@@ -1,19 +1,32 @@
+import asyncio
+import ctypes
+import ctypes.util
+import functools
+from collections import Counter
 import os
+import re
 import subprocess
+import threading
 from pathlib import Path
 
-from thefuzz import process
+from rapidfuzz import fuzz, process, utils
 from textual.app import App, ComposeResult
 from textual.containers import Horizontal, Vertical, ScrollableContainer
-from textual.widgets import Input, ListView, ListItem, Label, Static
+from textual.widgets import Input, ListView, ListItem, Label, Static, OptionList
 from textual.reactive import reactive
 from textual.screen import ModalScreen
 from textual.widgets import Button
-from rich.text import Text
+from textual.timer import Timer
+from textual.content import Content
 
 SYS_MODULE = Path("/sys/module")
 MODPROBE_D = Path("/etc/modprobe.d")
 
+# Seconds of typing idle before the module search runs
+SEARCH_DEBOUNCE = 0.08
+# Seconds of selection idle before module details are loaded
+DETAILS_DEBOUNCE = 0.08
+
 STRINGS = {
     "search_placeholder": "Search module (fuzzy)…",
     "help": "Arrow keys switch focus between lists | Enter/Click edits selected | Esc clears search",
@@ -42,38 +55,175 @@ STRINGS = {
 def get_loaded_modules() -> list[str]:
     if not SYS_MODULE.exists():
         return []
-    return sorted([d.name for d in SYS_MODULE.iterdir() if d.is_dir()])
+    # DirEntry.is_dir() uses the dirent type, so no stat per module
+    with os.scandir(SYS_MODULE) as it:
+        return sorted(e.name for e in it if e.is_dir(follow_symlinks=False))
 
 
-def get_etc_configs(module_name: str) -> dict[str, list[dict]]:
-    configs: dict[str, list[dict]] = {}
-    if not MODPROBE_D.exists():
-        return configs
+def _read_small(path: str) -> str:
+    # Raw os.read skips Path/TextIOWrapper setup, which dominates for the
+    # tiny files read here
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        chunks = []
+        while chunk := os.read(fd, 8192):
+            chunks.append(chunk)
+    finally:
+        os.close(fd)
+    return b"".join(chunks).decode("utf-8", "replace")
+
+
+# "options <module> <params...>" lines and the name=value pairs in them
+_OPTIONS_RE = re.compile(r"^[ \t]*options[ \t]+(\S+)[ \t]+(.+)$", re.MULTILINE)
+_KV_RE = re.compile(r"(\S+?)=(\S*)")
+
+# module name -> {param: [entries]}, parsed once from MODPROBE_D
+_etc_cache: dict[str, dict[str, list[dict]]] | None = None
+_etc_mtime: int | None = None
 
+
+def _build_etc_cache() -> dict[str, dict[str, list[dict]]]:
+    cache: dict[str, dict[str, list[dict]]] = {}
     for config_file in MODPROBE_D.glob("*.conf"):
         try:
-            for raw in config_file.read_text().splitlines():
-                line = raw.strip()
-                if not line or line.startswith("#"):
-                    continue
-                parts = line.split()
-                if len(parts) >= 3 and parts[0] == "options" and parts[1] == module_name:
-                    for part in parts[2:]:
-                        if "=" in part:
-                            p_name, p_value = part.split("=", 1)
-                            configs.setdefault(p_name, []).append(
-                                {"value": p_value, "file": config_file.name, "line": raw.strip()}
-                            )
+            text = _read_small(str(config_file))
         except Exception:
             continue
+        # Blank and comment lines never match the anchored "options" regex
+        for m in _OPTIONS_RE.finditer(text):
+            configs = cache.setdefault(m.group(1), {})
+            line = m.group(0).strip()
+            for kv in _KV_RE.finditer(m.group(2)):
+                configs.setdefault(kv.group(1), []).append(
+                    {"value": kv.group(2), "file": config_file.name, "line": line}
+                )
+    return cache
+
+
+def get_etc_configs(module_name: str) -> dict[str, list[dict]]:
+    """
+    Persistent options for a module from /etc/modprobe.d.
+
+    All files are parsed once; the cache is rebuilt only when the directory
+    mtime changes (a config file was added, removed or replaced).
+    """
+    global _etc_cache, _etc_mtime
+    try:
+        mtime = MODPROBE_D.stat().st_mtime_ns
+    except OSError:
+        return {}
+
+    if _etc_cache is None or mtime != _etc_mtime:
+        _etc_cache = _build_etc_cache()
+        _etc_mtime = mtime
+
+    return _etc_cache.get(module_name, {})
 
-    return configs
+
+# module name -> {param: description}, filled lazily or by prewarm_modinfo
+_modinfo_cache: dict[str, dict[str, str]] = {}
+
+
+def _load_libkmod():
+    """
+    Bind the few libkmod calls needed to read module info in-process.
+
+    Returns (lib, ctx), or None when libkmod isn't available, in which
+    case modinfo is run as a subprocess instead.
+    """
+    lib_name = ctypes.util.find_library("kmod")
+    if lib_name is None:
+        return None
+    try:
+        lib = ctypes.CDLL(lib_name)
+    except OSError:
+        return None
+
+    vp = ctypes.c_void_p
+    lib.kmod_new.restype = vp
+    lib.kmod_new.argtypes = [ctypes.c_char_p, vp]
+    lib.kmod_module_new_from_name.argtypes = [vp, ctypes.c_char_p, ctypes.POINTER(vp)]
+    lib.kmod_module_unref.restype = vp
+    lib.kmod_module_unref.argtypes = [vp]
+    lib.kmod_module_get_info.argtypes = [vp, ctypes.POINTER(vp)]
+    lib.kmod_module_info_free_list.argtypes = [vp]
+    lib.kmod_module_info_get_key.restype = ctypes.c_char_p
+    lib.kmod_module_info_get_key.argtypes = [vp]
+    lib.kmod_module_info_get_value.restype = ctypes.c_char_p
+    lib.kmod_module_info_get_value.argtypes = [vp]
+    lib.kmod_list_next.restype = vp
+    lib.kmod_list_next.argtypes = [vp, vp]
+
+    ctx = lib.kmod_new(None, None)
+    if not ctx:
+        return None
+    return lib, ctx
+
+
+_libkmod = _load_libkmod()
+# a kmod_ctx must not be used from several threads at once
+_libkmod_lock = threading.Lock()
+
+
+def _modinfo_libkmod(module_name: str) -> dict[str, str] | None:
+    """
+    Same result as parsing modinfo -p, read through libkmod.
+
+    "parm" and "parmtype" entries are joined like modinfo does
+    ("desc (type)"). Returns None if libkmod can't find the module.
+    """
+    lib, ctx = _libkmod
+    descs: dict[str, str] = {}
+    types: dict[str, str] = {}
+    with _libkmod_lock:
+        mod = ctypes.c_void_p()
+        if lib.kmod_module_new_from_name(ctx, module_name.encode(), ctypes.byref(mod)) < 0:
+            return None
+        try:
+            info = ctypes.c_void_p()
+            if lib.kmod_module_get_info(mod, ctypes.byref(info)) < 0:
+                return None
+            entry = info.value
+            while entry:
+                key = lib.kmod_module_info_get_key(entry)
+                value = lib.kmod_module_info_get_value(entry)
+                if key in (b"parm", b"parmtype") and value and b":" in value:
+                    name, text = value.decode(errors="replace").split(":", 1)
+                    target = descs if key == b"parm" else types
+                    target[name.strip()] = text.strip()
+                entry = lib.kmod_list_next(info, entry)
+            lib.kmod_module_info_free_list(info)
+        finally:
+            lib.kmod_module_unref(mod)
+
+    out: dict[str, str] = {}
+    for name in {**descs, **types}:
+        desc = descs.get(name, "")
+        ptype = types.get(name)
+        out[name] = f"{desc} ({ptype})".strip() if ptype else desc
+    return out
 
 
 def get_modinfo_details(module_name: str) -> dict[str, str]:
     """
     modinfo -p <mod> prints: param:description
+
+    Read through libkmod when available, otherwise from the modinfo binary.
+    Cached per module: the descriptions are static for the module's lifetime,
+    so revisiting a module does not look them up again.
     """
+    cached = _modinfo_cache.get(module_name)
+    if cached is not None:
+        return cached
+
+    if _libkmod is not None:
+        # modinfo reads through libkmod too, so a miss here (e.g. core
+        # namespaces like "printk") would fail there as well
+        out = _modinfo_libkmod(module_name) or {}
+        _modinfo_cache[module_name] = out
+        return out
+
+    out = {}
     try:
         result = subprocess.run(
             ["modinfo", "-p", module_name],
@@ -81,18 +231,74 @@ def get_modinfo_details(module_name: str) -> dict[str, str]:
             text=True,
             check=False,
         )
-        if result.returncode != 0:
-            return {}
-        out: dict[str, str] = {}
-        for line in result.stdout.splitlines():
-            clean = line.strip()
-            if not clean or ":" not in clean:
-                continue
-            name, desc = clean.split(":", 1)
-            out[name.strip()] = desc.strip()
-        return out
+        if result.returncode == 0:
+            for line in result.stdout.splitlines():
+                clean = line.strip()
+                if not clean or ":" not in clean:
+                    continue
+                name, desc = clean.split(":", 1)
+                out[name.strip()] = desc.strip()
     except Exception:
-        return {}
+        pass
+
+    _modinfo_cache[module_name] = out
+    return out
+
+
+def prewarm_modinfo(modules: list[str], chunk_size: int = 64) -> None:
+    """
+    Fill the modinfo cache with one modinfo call per chunk of modules.
+
+    Full modinfo output has a "name:" line per module and one
+    "parm: param:description" line per parameter; blocks start at
+    "filename:". Modules that can't be matched to a block are left for
+    get_modinfo_details to fetch lazily.
+    """
+    pending = [m for m in modules if m not in _modinfo_cache]
+    if _libkmod is not None:
+        # In-process lookups are cheap; no need to batch
+        for module_name in pending:
+            get_modinfo_details(module_name)
+        return
+
+    for start in range(0, len(pending), chunk_size):
+        chunk = pending[start:start + chunk_size]
+        try:
+            result = subprocess.run(
+                ["modinfo", *chunk],
+                capture_output=True,
+                text=True,
+                check=False,
+            )
+        except Exception:
+            return
+
+        blocks: list[tuple[str, dict[str, str]]] = []
+        name: str | None = None
+        parms: dict[str, str] = {}
+        for line in result.stdout.splitlines():
+            key, _, value = line.partition(":")
+            value = value.strip()
+            # A new block starts at "filename:", or at a second "name:" for
+            # built-in modules, which print "name:" before "filename:"
+            if (key == "filename" and value != "(builtin)") or (
+                key == "name" and name is not None
+            ):
+                if name is not None:
+                    blocks.append((name, parms))
+                name, parms = None, {}
+            if key == "name":
+                name = value
+            elif key == "parm" and ":" in value:
+                p_name, desc = value.split(":", 1)
+                parms[p_name.strip()] = desc.strip()
+        if name is not None:
+            blocks.append((name, parms))
+
+        wanted = set(chunk)
+        for mod_name, mod_parms in blocks:
+            if mod_name in wanted:
+                _modinfo_cache.setdefault(mod_name, mod_parms)
 
 
 def read_sysfs_params(module_name: str) -> list[dict]:
@@ -100,28 +306,40 @@ def read_sysfs_params(module_name: str) -> list[dict]:
     if not param_dir.exists():
         return []
 
+    with os.scandir(param_dir) as it:
+        entries = sorted(it, key=lambda e: e.name)
+
     params: list[dict] = []
-    for p in sorted(param_dir.iterdir(), key=lambda x: x.name):
-        if not p.is_file():
+    for entry in entries:
+        if not entry.is_file():
             continue
-            
-        # Find stats info from file
-        mode = p.stat().st_mode
-        
-        # check rw access (owner, group, others)
-        is_globally_writable = bool(mode & 0o222)
 
+        # One open + fstat + read per parameter; the fstat gives the mode
         try:
-            current = p.read_text().strip()
-        except Exception:
+            fd = os.open(entry.path, os.O_RDONLY)
+        except OSError:
+            # e.g. write-only params: still report the mode
+            mode = entry.stat().st_mode
             current = STRINGS["unreadable"]
+        else:
+            try:
+                mode = os.fstat(fd).st_mode
+                try:
+                    current = os.read(fd, 4096).decode().strip()
+                except Exception:
+                    current = STRINGS["unreadable"]
+            finally:
+                os.close(fd)
+
+        # check rw access (owner, group, others)
+        is_globally_writable = bool(mode & 0o222)
 
         params.append(
             {
-                "name": p.name,
+                "name": entry.name,
                 "current": current,
                 "writable": is_globally_writable,
-                "path": str(p),
+                "path": entry.path,
             }
         )
     return params
@@ -168,6 +386,64 @@ def format_module_details(model: dict) -> str:
     return "\n".join(lines).strip()
 
 
+def build_char_index(names: list[str]) -> dict[str, list[int]]:
+    # char -> indices of the names containing it, built once per module list
+    index: dict[str, list[int]] = {}
+    for i, name in enumerate(names):
+        for ch in set(name):
+            index.setdefault(ch, []).append(i)
+    return index
+
+
+def fuzzy_candidates(
+    query: str, names: list[str], char_index: dict[str, list[int]], threshold: int
+) -> list[int] | None:
+    """
+    Indices of names that can still reach `threshold`, or None to scan all.
+
+    partial_ratio (and ratio) scores are bounded by how many query
+    characters occur in the name, so names with too few shared characters
+    can't reach the cutoff and are skipped before rapidfuzz sees them. The
+    bound does not hold for token-based scorers such as WRatio. Queries made
+    of common characters prune almost nothing, so they skip the pass.
+    """
+    chars = set(query)
+    if sum(len(char_index.get(ch, ())) for ch in chars) > 1.5 * len(names):
+        return None
+
+    hits: Counter[int] = Counter()
+    for ch in query:
+        hits.update(char_index.get(ch, ()))
+
+    t = threshold / 100
+    factor = t / (2 - t)
+    q_len = len(query)
+    # -1 leaves slack for the spaces token-based scorers add or drop
+    return sorted(
+        i for i, n in hits.items() if n >= factor * min(q_len, len(names[i])) - 1
+    )
+
+
+def format_param_row(p: dict, detailed: bool = True) -> Content:
+    # One markup template per row is cheaper than building a Text span by
+    # span. Values go in as $variables, so brackets or a trailing backslash
+    # in them are never parsed as markup.
+    if p["writable"]:
+        tag, name_style = "[bold green]\\[RW][/]", "bold green"
+    else:
+        tag, name_style = "[dim white]\\[RO][/]", "bold white"
+    markup = f"{tag} [{name_style}]$name[/][bold yellow] = $current[/]"
+    variables = {"name": p["name"], "current": p["current"]}
+    if detailed:
+        markup += "\n[italic dim]$desc[/]"
+        variables["desc"] = p["desc"]
+        for i, item in enumerate(p["persistent"]):
+            markup += f"\n[dim]Persistent: $file{i} -> $line{i}[/]"
+            variables[f"file{i}"] = item["file"]
+            variables[f"line{i}"] = item["line"]
+    return Content.from_markup(markup, **variables)
+
+
 
 class EditModal(ModalScreen):
     def __init__(self, param_name, current_value, param_path):
@@ -241,9 +517,8 @@ Screen {
 }
 
 
-#left ListItem {
+#left > .option-list--option {
     padding: 0 1;
-    height: 1;
 }
 
 ListItem:focus {
@@ -337,7 +612,7 @@ ListItem:focus {
                         # needs sudo
                         Path(p['path']).write_text(new_value)
                         self.notify(STRINGS["ok_updated"].format(name=p["name"], value=new_value))
-                        self._load_details(self.current_model['module'])
+                        self._show_details(self.current_model['module'])
                     except Exception as e:
                         self.notify(STRINGS["err_write"].format(error=e), severity="error")
 
@@ -347,6 +622,14 @@ ListItem:focus {
     
 
     all_modules: list[str] = []
+    _norm_modules: list[str] = []
+    _char_index: dict[str, list[int]] = {}
+    _expanded_item: ListItem | None = None
+    # normalized query of the last search and the indices it prefix-matched
+    _last_query: str = ""
+    _last_prefix: list[int] = []
+    _search_timer: Timer | None = None
+    _load_timer: Timer | None = None
     filtered: reactive[list[str]] = reactive([])
 
         
@@ -354,7 +637,7 @@ ListItem:focus {
         yield Vertical(
             Input(placeholder=STRINGS["search_placeholder"], id="search"),
             Horizontal(
-                ListView(id="left"),
+                OptionList(id="left"),
                 Vertical(
                     Static(id="mod_title", classes="title"),
                     ListView(id="param_list"),
@@ -367,24 +650,45 @@ ListItem:focus {
 
     def on_mount(self) -> None:
         self.all_modules = get_loaded_modules()
+        self._norm_modules = [utils.default_process(m) for m in self.all_modules]
+        self._char_index = build_char_index(self._norm_modules)
         self.filtered = self.all_modules[:]  # show all initially
         self._render_list(self.filtered)
+        # Fetch parameter descriptions in bulk off the UI thread
+        self.run_worker(
+            functools.partial(prewarm_modinfo, self.all_modules),
+            thread=True,
+        )
 
     def _render_list(self, names: list[str]) -> None:
-        lv = self.query_one("#left", ListView)
-        lv.clear()
-        for n in names:
-            item = ListItem(Label(n))
-            item.data = n  # store the module name here
-            lv.append(item)
+        # OptionList keeps plain strings and only renders the visible rows,
+        # so no widget is built per module
+        ol = self.query_one("#left", OptionList)
+        ol.set_options(names)
 
         if names:
-            lv.index = 0
-            self._load_details(names[0])
+            ol.highlighted = 0
+            self._show_details(names[0])
             
         
-    def _load_details(self, module_name: str) -> None:
-        self.current_model = get_module_model(module_name)
+    def _show_details(self, module_name: str) -> None:
+        # Debounce: rapid selections only load the last module
+        if self._load_timer is not None:
+            self._load_timer.stop()
+        self._load_timer = self.set_timer(
+            DETAILS_DEBOUNCE, lambda: self._start_load(module_name)
+        )
+
+    def _start_load(self, module_name: str) -> None:
+        self._load_timer = None
+        # exclusive: a newer selection cancels a load still in flight
+        self.run_worker(
+            self._load_details(module_name), group="details", exclusive=True
+        )
+
+    async def _load_details(self, module_name: str) -> None:
+        # modinfo/sysfs reads block, so keep them off the event loop
+        self.current_model = await asyncio.to_thread(get_module_model, module_name)
         
         self.query_one("#mod_title", Static).update(
             f"[b][u]{STRINGS['module_title'].format(name=module_name)}[/u][/b]"
@@ -393,60 +697,130 @@ ListItem:focus {
         param_list = self.query_one("#param_list", ListView)
         param_list.clear()
         
+        # Rows start as a single "name = value" line; the highlighted row is
+        # expanded with its description in on_list_view_highlighted
+        self._expanded_item = None
         for p in self.current_model["params"]:
-            # Create rich text object for colors
-            
-            content = Text()
-            
-            if p["writable"]:
-                content.append("[RW] ", style="bold green")
-                name_style = "green"
-            else:
-                content.append("[RO] ", style="dim white")
-                name_style = "white"
-                
-            content.append(p["name"], style=f"bold {name_style}")
-            content.append(f" = {p['current']}\n", style="bold yellow")
-            content.append(p["desc"], style="italic dim")
-            
-
-            item = ListItem(Static(content))
+            item = ListItem(Static(format_param_row(p, detailed=False)))
             item.param_data = p
             param_list.append(item)
-        
+
 
 
     def on_input_changed(self, event: Input.Changed) -> None:
         if event.input.id != "search":
             return
         
+        # Debounce: a burst of keystrokes only triggers the last search
+        if self._search_timer is not None:
+            self._search_timer.stop()
+            self._search_timer = None
+
         q = event.value.strip()
         if not q:
+            self._last_query, self._last_prefix = "", []
             self.filtered = self.all_modules[:]
             self._render_list(self.filtered)
             return
 
-        # Fuzzy rank from all modules; show top N that are "relevant enough"
-        results = process.extract(q, self.all_modules, limit=200)
+        self._search_timer = self.set_timer(SEARCH_DEBOUNCE, lambda: self._do_search(q))
+
+    def _do_search(self, q: str) -> None:
+        self._search_timer = None
+
+        # Module names are normalized once in on_mount, so only the query
+        # needs processing here.
+        norm_q = utils.default_process(q)
+
+        # Fast path: most searches are prefixes ("nvi", "snd_"), which a plain
+        # startswith scan answers without any edit-distance work. When the
+        # query only grew ("net" -> "netw"), its prefix matches are a subset
+        # of the previous ones, so only those need rescanning.
+        if self._last_query and norm_q.startswith(self._last_query):
+            scan = self._last_prefix
+        else:
+            scan = range(len(self._norm_modules))
+        prefix = [i for i in scan if self._norm_modules[i].startswith(norm_q)]
+        self._last_query, self._last_prefix = norm_q, prefix
+
+        if len(prefix) >= 5:
+            self.filtered = [self.all_modules[i] for i in prefix[:200]]
+            self._render_list(self.filtered)
+            return
+
         # Heuristic cutoff so list shrinks as query gets specific
-        
-        threshold = 65 if len(q) >= 2 else 50
-        ranked = [name for name, score in results if score >= threshold]
+        threshold = 75 if len(q) >= 2 else 50
+
+        # Fuzzy rank the modules that can still pass the threshold; show top N
+        # that are "relevant enough".
+        # process.extract applies score_cutoff and the top-N partial sort in
+        # native code; extract_iter + heapq.nlargest measured slower here.
+        candidates = fuzzy_candidates(
+            norm_q, self._norm_modules, self._char_index, threshold
+        )
+        if candidates is None:
+            results = process.extract(
+                norm_q,
+                self._norm_modules,
+                scorer=fuzz.partial_ratio,
+                processor=None,
+                limit=200,
+                score_cutoff=threshold,
+            )
+        else:
+            results = [
+                (name, score, candidates[idx])
+                for name, score, idx in process.extract(
+                    norm_q,
+                    [self._norm_modules[i] for i in candidates],
+                    scorer=fuzz.partial_ratio,
+                    processor=None,
+                    limit=200,
+                    score_cutoff=threshold,
+                )
+            ]
 
         # Fallback: if threshold filters everything, show top 20 anyway
-        if not ranked:
-            ranked = [name for name, _ in results[:20]]
+        if not results and not prefix:
+            results = process.extract(
+                norm_q,
+                self._norm_modules,
+                scorer=fuzz.partial_ratio,
+                processor=None,
+                limit=20,
+            )
+
+        # Prefix matches first, then fuzzy matches not already listed
+        seen = set(prefix)
+        ranked_idx = prefix + [idx for _, _, idx in results if idx not in seen]
+        ranked = [self.all_modules[i] for i in ranked_idx[:200]]
 
         self.filtered = ranked
         self._render_list(self.filtered)
 
+    def on_option_list_option_selected(self, event: OptionList.OptionSelected) -> None:
+        if event.option_list.id == "left":
+            self._show_details(self.filtered[event.option_index])
+
+    def on_list_view_highlighted(self, event: ListView.Highlighted) -> None:
+        if event.list_view.id != "param_list":
+            return
+
+        # Collapse the previously expanded row, expand the highlighted one
+        previous = self._expanded_item
+        if previous is not None and previous.is_attached:
+            previous.query_one(Static).update(
+                format_param_row(previous.param_data, detailed=False)
+            )
+        self._expanded_item = None
+
+        item = event.item
+        if item is not None and hasattr(item, "param_data"):
+            item.query_one(Static).update(format_param_row(item.param_data))
+            self._expanded_item = item
+
     def on_list_view_selected(self, event: ListView.Selected) -> None:
-        if event.list_view.id == "left":
-            module_name = getattr(event.item, "data", None)
-            if module_name:
-                self._load_details(module_name)
-        
-        elif event.list_view.id == "param_list":
+        if event.list_view.id == "param_list":
             self.action_edit_parameter()
             
 if __name__ == "__main__":